@@ -0,0 +1,315 @@
+"""
+数据库与尺码计算 - server.py 和 gunicorn.conf.py 共用
+连接池、PRAGMA、建表迁移、批量写入线程、尺码表都只在这里维护一份
+"""
+
+from flask import g
+import logging
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+from bisect import bisect_right
+
+logger = logging.getLogger(__name__)
+
+# 数据库路径 - 使用临时目录
+DB_PATH = os.path.join(tempfile.gettempdir(), 'size_records.db')
+
+BUSY_TIMEOUT = 5  # 数据库被其他进程锁住时的最长等待时间（秒）
+
+# 空闲连接池 - 跨请求复用连接，避免每次请求重新打开数据库文件
+_idle_connections = queue.SimpleQueue()
+
+def _connect():
+    """打开一个新的数据库连接并设置PRAGMA"""
+    # 连接会在不同的工作线程之间复用
+    conn = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT, check_same_thread=False)
+    conn.row_factory = sqlite3.Row                # 查询结果可按列名访问，直接转dict
+    conn.execute('PRAGMA journal_mode=WAL')       # 写入不阻塞读取
+    conn.execute('PRAGMA synchronous=NORMAL')     # WAL模式下只在检查点时fsync
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute('PRAGMA cache_size=-20000')      # 约20MB页缓存
+    conn.execute('PRAGMA mmap_size=268435456')    # 256MB内存映射
+    return conn
+
+def _acquire_connection():
+    """从连接池取一个空闲连接，没有则新建"""
+    try:
+        return _idle_connections.get_nowait()
+    except queue.Empty:
+        return _connect()
+
+def get_db():
+    """获取当前请求的数据库连接（优先从连接池取）"""
+    if 'db' not in g:
+        g.db = _acquire_connection()
+    return g.db
+
+def release_db(exception):
+    """请求结束时将连接归还连接池（注册为teardown_appcontext）"""
+    conn = g.pop('db', None)
+    if conn is not None:
+        conn.rollback()  # 丢弃未提交的事务，保证连接干净
+        _idle_connections.put(conn)
+
+def close_connections():
+    """关闭连接池中的空闲连接（gunicorn fork worker前调用）"""
+    while True:
+        try:
+            _idle_connections.get_nowait().close()
+        except queue.Empty:
+            break
+
+# 数据库初始化
+def init_database():
+    """初始化SQLite数据库"""
+    try:
+        conn = _acquire_connection()
+        try:
+            cursor = conn.cursor()
+            # 改名/建表/迁移/删旧表放在同一个事务里：迁移失败时整体回滚，旧数据原样保留
+            cursor.execute('BEGIN IMMEDIATE')
+            
+            # 旧版本的created_at是ISO格式文本，先改名，建好新表后再迁移数据
+            columns = {row[1]: row[2] for row in cursor.execute('PRAGMA table_info(size_records)')}
+            migrate = columns.get('created_at') == 'TEXT'
+            if migrate:
+                cursor.execute('ALTER TABLE size_records RENAME TO size_records_old')
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS size_records (
+                    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+                    gender      TEXT    NOT NULL,
+                    height      REAL    NOT NULL,
+                    weight      REAL    NOT NULL,
+                    bust        REAL    NOT NULL,
+                    waist       REAL    NOT NULL,
+                    hips        REAL    NOT NULL,
+                    top_size    TEXT    NOT NULL,
+                    bottom_size TEXT    NOT NULL,
+                    bmi         REAL    NOT NULL,
+                    created_at  INTEGER NOT NULL  -- UTC毫秒时间戳
+                )
+            ''')
+            
+            if migrate:
+                cursor.execute('''
+                    INSERT INTO size_records
+                    SELECT id, gender, height, weight, bust, waist, hips,
+                           top_size, bottom_size, bmi,
+                           CAST(ROUND((julianday(created_at) - 2440587.5) * 86400000) AS INTEGER)
+                    FROM size_records_old
+                ''')
+                cursor.execute('DROP TABLE size_records_old')
+                logger.info("✅ created_at已迁移为毫秒时间戳")
+            
+            # 最新记录查询（ORDER BY created_at DESC, id DESC LIMIT ?）反向遍历这个索引即可，不需要排序
+            # 索引按升序建立：反向遍历时隐含的rowid也是降序，同一毫秒写入的批量记录顺序稳定
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_created_at ON size_records(created_at)')
+            # 统计查询只需扫描这个覆盖索引，不用读整张表
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_gender_bmi ON size_records(gender, bmi)')
+            
+            conn.commit()
+        finally:
+            conn.rollback()  # 出错时丢弃未提交的事务，保证归还的连接干净
+            _idle_connections.put(conn)
+        logger.info("✅ 数据库初始化完成")
+        return True
+    except Exception as e:
+        logger.error("❌ 数据库初始化失败: %s", e)
+        return False
+
+# 批量写入 - 后台线程把并发请求的INSERT合并到同一个事务，共用一次fsync
+INSERT_SQL = '''
+    INSERT INTO size_records
+    (gender, height, weight, bust, waist, hips, top_size, bottom_size, bmi, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+# 单条写入用RETURNING在同一次执行里取回ID（需要SQLite 3.35+）
+INSERT_RETURNING_SQL = INSERT_SQL.rstrip() + ' RETURNING id'
+WRITE_BATCH_SIZE = 200  # 单个事务最多合并的写入请求数
+WRITE_TIMEOUT = 10      # 请求等待写入完成的最长时间（秒），大于BUSY_TIMEOUT
+
+_write_queue = queue.Queue()
+_writer_thread = None
+_writer_lock = threading.Lock()
+
+class _PendingWrite:
+    """等待后台线程写入的一组记录"""
+    __slots__ = ('rows', 'claim', 'done', 'record_ids', 'error')
+
+    def __init__(self, rows):
+        self.rows = rows
+        # 写入线程取走记录、请求超时放弃写入，两者先拿到锁的一方生效
+        self.claim = threading.Lock()
+        self.done = threading.Event()
+        self.record_ids = None
+        self.error = None
+
+def _insert_batch(conn, batch):
+    """在一个事务里写入一批请求的记录，并为每个请求填好记录ID"""
+    rows = [row for p in batch for row in p.rows]
+    if len(rows) == 1:
+        # 只有一条：自动提交模式下单条语句即一个事务
+        # 需要读完结果，语句执行结束后才会提交
+        first_id = conn.execute(INSERT_RETURNING_SQL, rows[0]).fetchall()[0][0]
+    else:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.executemany(INSERT_SQL, rows)
+        last_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+        conn.execute('COMMIT')
+        # BEGIN IMMEDIATE持有写锁，同一事务内分配的自增ID是连续的
+        first_id = last_id - len(rows) + 1
+    
+    next_id = first_id
+    for p in batch:
+        p.record_ids = list(range(next_id, next_id + len(p.rows)))
+        next_id += len(p.rows)
+
+# 只由某一行数据本身引起的错误，值得逐个请求重试；锁超时、磁盘错误等对整批都一样
+ROW_ERRORS = (sqlite3.IntegrityError, sqlite3.InterfaceError, sqlite3.ProgrammingError)
+
+def _rollback(conn):
+    """回滚写入线程连接上未结束的事务"""
+    if conn.in_transaction:
+        conn.execute('ROLLBACK')
+
+def _write_batch(conn, batch):
+    """写入一批请求，因个别记录失败时逐个重试"""
+    try:
+        _insert_batch(conn, batch)
+    except sqlite3.Error as e:
+        _rollback(conn)
+        if len(batch) == 1 or not isinstance(e, ROW_ERRORS):
+            # 与具体记录无关的错误整批失败一次：逐个重试可能每次都等满BUSY_TIMEOUT
+            for p in batch:
+                p.error = e
+            return
+        
+        # 逐个请求重试，错误只返回给出问题的那个请求
+        for i, p in enumerate(batch):
+            try:
+                _insert_batch(conn, [p])
+            except ROW_ERRORS as e:
+                _rollback(conn)
+                p.error = e
+            except sqlite3.Error as e:
+                # 重试中遇到锁超时等错误：剩下的请求直接失败，不再继续等待
+                _rollback(conn)
+                for q in batch[i:]:
+                    q.error = e
+                return
+
+def _writer_connection():
+    """写入线程专用连接，手动控制事务"""
+    conn = _connect()
+    conn.isolation_level = None
+    return conn
+
+def _writer_loop():
+    """后台写入线程 - 每次取出队列中所有待写记录，一个事务提交"""
+    conn = _writer_connection()
+    while True:
+        # 阻塞等待第一条，再顺带取走排队中的其余记录（跳过已超时放弃的请求）
+        batch = []
+        pending = _write_queue.get()
+        while True:
+            if pending.claim.acquire(blocking=False):
+                batch.append(pending)
+            if len(batch) >= WRITE_BATCH_SIZE:
+                break
+            try:
+                pending = _write_queue.get_nowait()
+            except queue.Empty:
+                break
+        if not batch:
+            continue
+        
+        try:
+            _write_batch(conn, batch)
+        except Exception:
+            # 意外异常（包括ROLLBACK本身失败）：换一个新连接丢弃未结束的事务，线程继续工作
+            logger.exception("❌ 写入线程异常")
+            conn.close()
+            conn = _writer_connection()
+        finally:
+            # 无论如何都要唤醒等待的请求：已被取走的请求不会超时，漏掉就会永远阻塞
+            for p in batch:
+                if p.record_ids is None and p.error is None:
+                    p.error = sqlite3.OperationalError('写入线程异常')
+                p.done.set()
+
+def _ensure_writer():
+    """按需启动后台写入线程（fork后的子进程会重新启动）"""
+    global _writer_thread
+    if _writer_thread is not None and _writer_thread.is_alive():
+        return
+    with _writer_lock:
+        if _writer_thread is None or not _writer_thread.is_alive():
+            _writer_thread = threading.Thread(target=_writer_loop, name='db-writer', daemon=True)
+            _writer_thread.start()
+
+def save_records(rows):
+    """把一组记录交给后台线程写入，返回对应的记录ID列表"""
+    _ensure_writer()
+    pending = _PendingWrite(rows)
+    _write_queue.put(pending)
+    if not pending.done.wait(WRITE_TIMEOUT):
+        if pending.claim.acquire(blocking=False):
+            # 还在队列里没被取走：放弃这次写入再报超时，客户端重试不会产生重复记录
+            raise sqlite3.OperationalError('写入超时')
+        # 已被写入线程取走，等待真实的写入结果
+        pending.done.wait()
+    if pending.error is not None:
+        raise pending.error
+    return pending.record_ids
+
+def save_record(row):
+    """写入一条记录，返回记录ID"""
+    return save_records([row])[0]
+
+# 尺码表 - 阈值单调递增，用二分查找代替if/elif阶梯
+# bisect_right: 恰好等于阈值时进入下一档，与原来的 "< 阈值" 判断一致
+FEMALE_TOP_TH     = (80, 85, 90, 95, 100)
+FEMALE_TOP_LBL    = ('XS', 'S', 'M', 'L', 'XL', 'XXL')
+FEMALE_BOTTOM_TH  = (60, 65, 70, 75, 80)
+FEMALE_BOTTOM_LBL = ('XS', 'S', 'M', 'L', 'XL', 'XXL')
+
+MALE_TOP_TH     = (88, 92, 96, 100)
+MALE_TOP_LBL    = ('S', 'M', 'L', 'XL', 'XXL')
+MALE_BOTTOM_TH  = (72, 76, 80, 85)
+MALE_BOTTOM_LBL = ('S', 'M', 'L', 'XL', 'XXL')
+
+# 按性别下标索引的尺码表（解析请求时把性别转成下标，计算时不再比较字符串）
+FEMALE, MALE = 0, 1
+TOP_TH     = (FEMALE_TOP_TH, MALE_TOP_TH)
+TOP_LBL    = (FEMALE_TOP_LBL, MALE_TOP_LBL)
+BOTTOM_TH  = (FEMALE_BOTTOM_TH, MALE_BOTTOM_TH)
+BOTTOM_LBL = (FEMALE_BOTTOM_LBL, MALE_BOTTOM_LBL)
+
+# 尺码计算函数
+def calculate_size(gender_idx, bust, waist):
+    """根据性别下标（FEMALE/MALE）和三围计算尺码"""
+    return (TOP_LBL[gender_idx][bisect_right(TOP_TH[gender_idx], bust)],
+            BOTTOM_LBL[gender_idx][bisect_right(BOTTOM_TH[gender_idx], waist)])
+
+def calculate_bmi(height, weight):
+    """计算BMI，保留一位小数"""
+    h = height * 0.01  # 厘米转米，用乘法代替除法和幂运算
+    return round(weight / (h * h), 1)
+
+def calculate_size_batch(measurements):
+    """批量计算尺码和BMI，返回可直接写入数据库的记录列表"""
+    created_at = int(time.time() * 1000)  # 同一批记录共用时间戳（UTC毫秒）
+    rows = []
+    for gender, gender_idx, height, weight, bust, waist, hips in measurements:
+        top_size, bottom_size = calculate_size(gender_idx, bust, waist)
+        rows.append((
+            gender, height, weight, bust, waist, hips,
+            top_size, bottom_size, calculate_bmi(height, weight),
+            created_at
+        ))
+    return rows
@@ -0,0 +1,23 @@
+"""
+Gunicorn 配置 - gevent worker
+Railway 启动命令: gunicorn server:app（自动读取本文件）
+"""
+
+# 尽早打补丁，让之后导入的标准库（threading/queue/socket）都支持协程切换
+from gevent import monkey
+monkey.patch_all()
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+worker_class = 'gevent'
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_connections = 1000
+
+# 主进程加载一次应用，建表/迁移/WAL设置只执行一次，worker直接继承
+preload_app = True
+
+def pre_fork(server, worker):
+    """fork前关闭主进程持有的数据库连接，SQLite连接不能跨进程使用"""
+    import _db
+    _db.close_connections()
@@ -3,89 +3,82 @@
 优化Railway部署版本 - 修复数据库路径问题
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request
 from flask_cors import CORS
+import orjson
+import hashlib
+import logging
+import math
 import sqlite3
 import os
-import tempfile
-from datetime import datetime
+import threading
+import time
+
+from _db import (
+    DB_PATH, FEMALE, MALE, get_db, release_db, init_database,
+    save_record, save_records, calculate_size, calculate_bmi, calculate_size_batch
+)
+
+# 日志 - 生产环境默认INFO，请求级别的调试日志在级别检查处直接跳过
+logging.basicConfig(
+    level=os.environ.get('LOG_LEVEL', 'INFO').upper(),
+    format='%(asctime)s %(levelname)s %(message)s'
+)
+logger = logging.getLogger(__name__)
 
 # 创建Flask应用
 app = Flask(__name__)
 CORS(app, resources={r"/api/*": {"origins": "*"}})
+app.teardown_appcontext(release_db)  # 请求结束时归还数据库连接
 
-# 数据库路径 - 使用临时目录
-DB_PATH = os.path.join(tempfile.gettempdir(), 'size_records.db')
-print(f"📁 数据库路径: {DB_PATH}")
+logger.info("📁 数据库路径: %s", DB_PATH)
 
-# 数据库初始化
-def init_database():
-    """初始化SQLite数据库"""
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS size_records (
-                id          INTEGER PRIMARY KEY AUTOINCREMENT,
-                gender      TEXT    NOT NULL,
-                height      REAL    NOT NULL,
-                weight      REAL    NOT NULL,
-                bust        REAL    NOT NULL,
-                waist       REAL    NOT NULL,
-                hips        REAL    NOT NULL,
-                top_size    TEXT    NOT NULL,
-                bottom_size TEXT    NOT NULL,
-                bmi         REAL    NOT NULL,
-                created_at  TEXT    NOT NULL
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-        print("✅ 数据库初始化完成")
-        return True
-    except Exception as e:
-        print(f"❌ 数据库初始化失败: {e}")
-        return False
+MAX_BATCH_SIZE = 100  # 批量计算接口单次最多记录数
 
-# 尺码计算函数
-def calculate_size(gender, bust, waist):
-    """根据性别和三围计算尺码"""
-    if gender == 'female':
-        if   bust < 80:  top = 'XS'
-        elif bust < 85:  top = 'S'
-        elif bust < 90:  top = 'M'
-        elif bust < 95:  top = 'L'
-        elif bust < 100: top = 'XL'
-        else:            top = 'XXL'
-        
-        if   waist < 60: bottom = 'XS'
-        elif waist < 65: bottom = 'S'
-        elif waist < 70: bottom = 'M'
-        elif waist < 75: bottom = 'L'
-        elif waist < 80: bottom = 'XL'
-        else:            bottom = 'XXL'
-    else:
-        if   bust < 88:  top = 'S'
-        elif bust < 92:  top = 'M'
-        elif bust < 96:  top = 'L'
-        elif bust < 100: top = 'XL'
-        else:            top = 'XXL'
-        
-        if   waist < 72: bottom = 'S'
-        elif waist < 76: bottom = 'M'
-        elif waist < 80: bottom = 'L'
-        elif waist < 85: bottom = 'XL'
-        else:            bottom = 'XXL'
+# /api/calculate 成功响应模板 - 只填4个字段，不用构造dict再序列化
+CALCULATE_RESPONSE = (
+    '{"success":true,"top_size":"%s","bottom_size":"%s","bmi":%.1f,'
+    '"record_id":%d,"message":"计算完成并已保存"}'
+).encode('utf-8')
+
+def json_response(payload):
+    """用orjson序列化JSON响应（比Flask自带的json编码器快）"""
+    return app.response_class(orjson.dumps(payload), mimetype='application/json')
+
+def parse_measurements(data):
+    """提取并验证一条测量数据，返回 (测量数据, 错误信息)"""
+    if not isinstance(data, dict):
+        return None, '数据格式错误: 应为JSON对象'
+    gender = data.get('gender', 'female')
+    if not isinstance(gender, str):
+        return None, '性别数据不合理'
+    # 统一存为female/male，与尺码表一致，统计里的男女人数之和才等于总数
+    gender, gender_idx = ('female', FEMALE) if gender == 'female' else ('male', MALE)
+    try:
+        height, weight, bust, waist, hips = (
+            float(data['height']), float(data['weight']), float(data['bust']),
+            float(data['waist']), float(data['hips'])
+        )
+    except KeyError:
+        return None, '数据不完整'
+    
+    # float()接受"inf"/"nan"，这些值算出的BMI无法写成合法JSON；任一非有限值都会让总和非有限
+    if not math.isfinite(height + weight + bust + waist + hips):
+        return None, '数据格式错误: 数值无效'
     
-    return top, bottom
+    if not (height and weight and bust and waist and hips):
+        return None, '数据不完整'
+    
+    if height < 100 or height > 250:
+        return None, '身高数据不合理'
+    
+    return (gender, gender_idx, height, weight, bust, waist, hips), None
 
 # API路由
 @app.route('/')
 def home():
     """根路径 - 返回欢迎信息"""
-    return jsonify({
+    return json_response({
         'message': '身材尺码计算器API',
         'version': '1.0',
         'status': 'running',
@@ -93,19 +86,19 @@ def home():
         'endpoints': {
             '/api/health': '健康检查',
             '/api/calculate': '计算尺码（POST）',
-            '/api/records': '获取历史记录'
+            '/api/records': '获取历史记录（?limit=1-100）',
+            '/api/stats': '统计数据'
         }
     })
 
+# 健康检查响应体 - 负载均衡器频繁探测，导入时序列化一次
+HEALTH_BODY = b'{"status":"ok"}'
+
 @app.route('/api/health')
 def health_check():
     """健康检查接口"""
-    return jsonify({
-        'status': 'ok',
-        'message': '服务器运行正常',
-        'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-        'database': 'connected'
-    })
+    # 每次返回新的Response：flask_cors会把第一个请求回显的Origin写进共享对象，之后的请求都会沿用它
+    return Response(HEALTH_BODY, mimetype='application/json')
 
 @app.route('/api/calculate', methods=['POST', 'OPTIONS'])
 def calculate():
@@ -116,142 +109,196 @@ def calculate():
     
     try:
         # 获取并打印请求数据（用于调试）
-        data = request.json
-        print(f"📥 收到计算请求: {data}")
-        
-        # 提取数据
-        gender = data.get('gender', 'female')
-        height = float(data.get('height', 0))
-        weight = float(data.get('weight', 0))
-        bust   = float(data.get('bust', 0))
-        waist  = float(data.get('waist', 0))
-        hips   = float(data.get('hips', 0))
+        data = orjson.loads(request.get_data(cache=False))
+        logger.debug("📥 收到计算请求: %s", data)
         
-        # 数据验证
-        if not all([height, weight, bust, waist, hips]):
-            print("❌ 数据不完整")
-            return jsonify({'success': False, 'error': '数据不完整'}), 400
+        # JSON数组 - 批量计算
+        if isinstance(data, list):
+            return calculate_batch(data)
         
-        if height < 100 or height > 250:
-            print(f"❌ 身高数据不合理: {height}")
-            return jsonify({'success': False, 'error': '身高数据不合理'}), 400
+        # 提取并验证数据
+        measurements, error = parse_measurements(data)
+        if error:
+            logger.debug("❌ %s", error)
+            return json_response({'success': False, 'error': error}), 400
+        gender, gender_idx, height, weight, bust, waist, hips = measurements
         
         # 计算尺码和BMI
-        top_size, bottom_size = calculate_size(gender, bust, waist)
-        bmi = round(weight / ((height / 100) ** 2), 1)
+        top_size, bottom_size = calculate_size(gender_idx, bust, waist)
+        bmi = calculate_bmi(height, weight)
         
-        print(f"✅ 计算结果: 上装={top_size}, 下装={bottom_size}, BMI={bmi}")
+        logger.debug("✅ 计算结果: 上装=%s, 下装=%s, BMI=%s", top_size, bottom_size, bmi)
         
         # 保存到数据库
         try:
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO size_records
-                (gender, height, weight, bust, waist, hips, top_size, bottom_size, bmi, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
+            record_id = save_record((
                 gender, height, weight, bust, waist, hips,
                 top_size, bottom_size, bmi,
-                datetime.utcnow().isoformat() + 'Z'  # 使用UTC时间的ISO格式
+                int(time.time() * 1000)  # UTC毫秒时间戳
             ))
             
-            record_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
+            logger.debug("✅ 数据已保存，ID: %s", record_id)
             
-            print(f"✅ 数据已保存，ID: {record_id}")
-            
-            return jsonify({
-                'success': True,
-                'top_size': top_size,
-                'bottom_size': bottom_size,
-                'bmi': bmi,
-                'record_id': record_id,
-                'message': '计算完成并已保存'
-            })
+            return Response(
+                CALCULATE_RESPONSE % (top_size.encode(), bottom_size.encode(), bmi, record_id),
+                mimetype='application/json'
+            )
             
         except sqlite3.Error as db_error:
-            print(f"❌ 数据库错误: {db_error}")
-            return jsonify({
+            logger.error("❌ 数据库错误: %s", db_error)
+            return json_response({
                 'success': False,
                 'error': f'数据库错误: {str(db_error)}'
             }), 500
         
     except ValueError as ve:
-        print(f"❌ 数据格式错误: {ve}")
-        return jsonify({
+        logger.debug("❌ 数据格式错误: %s", ve)
+        return json_response({
             'success': False,
             'error': f'数据格式错误: {str(ve)}'
         }), 400
         
     except Exception as e:
-        print(f"❌ 服务器错误: {e}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({
+        logger.exception("❌ 服务器错误: %s", e)
+        return json_response({
             'success': False,
             'error': f'服务器错误: {str(e)}'
         }), 500
 
+def calculate_batch(items):
+    """批量计算尺码并保存（请求体为JSON数组）"""
+    if not items or len(items) > MAX_BATCH_SIZE:
+        return json_response({'success': False, 'error': f'批量数据条数应为1-{MAX_BATCH_SIZE}'}), 400
+    
+    measurements = []
+    for i, item in enumerate(items, 1):
+        m, error = parse_measurements(item)
+        if error:
+            logger.debug("❌ 第%d条: %s", i, error)
+            return json_response({'success': False, 'error': f'第{i}条: {error}'}), 400
+        measurements.append(m)
+    
+    rows = calculate_size_batch(measurements)
+    
+    try:
+        record_ids = save_records(rows)
+    except sqlite3.Error as db_error:
+        logger.error("❌ 数据库错误: %s", db_error)
+        return json_response({
+            'success': False,
+            'error': f'数据库错误: {str(db_error)}'
+        }), 500
+    
+    logger.debug("✅ 批量数据已保存，共%d条", len(rows))
+    
+    return json_response({
+        'success': True,
+        'count': len(rows),
+        'results': [
+            {'top_size': row[6], 'bottom_size': row[7], 'bmi': row[8], 'record_id': record_id}
+            for row, record_id in zip(rows, record_ids)
+        ],
+        'message': '计算完成并已保存'
+    })
+
+# /api/records 响应缓存 - 记录只追加不修改，最新记录ID不变则结果不变
+# 用数据库里的最新ID而不是进程内计数器判断失效，多个gunicorn worker之间也一致
+_records_cache = {}  # limit -> (最新记录ID, 响应字节)
+_records_lock = threading.Lock()
+
+RECORDS_DEFAULT_LIMIT = 20
+RECORDS_MAX_LIMIT = 100
+
+STATS_SQL = '''
+    SELECT COUNT(*),
+           COALESCE(SUM(gender = 'female'), 0),
+           COALESCE(SUM(gender = 'male'), 0),
+           AVG(bmi)
+    FROM size_records
+'''
+
 @app.route('/api/records')
 def get_records():
     """获取历史记录"""
+    limit = request.args.get('limit', RECORDS_DEFAULT_LIMIT, type=int)
+    limit = min(max(limit, 1), RECORDS_MAX_LIMIT)
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_db()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT id, gender, height, weight, bust, waist, hips,
-                   top_size, bottom_size, bmi, created_at
-            FROM size_records
-            ORDER BY created_at DESC
-            LIMIT 20
-        ''')
-        
-        rows = cursor.fetchall()
-        conn.close()
+        # INTEGER PRIMARY KEY上的MAX()只读B树最右端，几乎没有开销
+        version = cursor.execute('SELECT MAX(id) FROM size_records').fetchone()[0]
+        cached = _records_cache.get(limit)
+        if cached is None or cached[0] != version:
+            # 只有重建缓存时才加锁，避免并发请求重复查询
+            with _records_lock:
+                cached = _records_cache.get(limit)
+                if cached is None or cached[0] != version:
+                    cached = _records_cache[limit] = (version, _render_records(cursor, limit))
         
-        records = []
-        for row in rows:
-            records.append({
-                'id': row[0],
-                'gender': row[1],
-                'height': row[2],
-                'weight': row[3],
-                'bust': row[4],
-                'waist': row[5],
-                'hips': row[6],
-                'top_size': row[7],
-                'bottom_size': row[8],
-                'bmi': row[9],
-                'created_at': row[10]
-            })
+        return app.response_class(cached[1], mimetype='application/json')
         
-        return jsonify({
+    except Exception as e:
+        logger.error("❌ 获取记录错误: %s", e)
+        return json_response({'success': False, 'error': str(e)}), 500
+
+def _render_records(cursor, limit):
+    """查询最新记录并序列化为JSON字节"""
+    # created_at在SQL里直接格式化为ISO字符串，行转dict后无需再处理
+    cursor.execute('''
+        SELECT id, gender, height, weight, bust, waist, hips,
+               top_size, bottom_size, bmi,
+               strftime('%Y-%m-%dT%H:%M:%fZ', created_at / 1000.0, 'unixepoch') AS created_at
+        FROM size_records
+        ORDER BY size_records.created_at DESC, id DESC  -- 限定表名，按原始列排序才能走索引
+        LIMIT ?
+    ''', (limit,))
+    
+    records = [dict(row) for row in cursor.fetchall()]
+    
+    return orjson.dumps({
+        'success': True,
+        'count': len(records),
+        'records': records
+    })
+
+@app.route('/api/stats')
+def get_stats():
+    """获取统计数据（总数、男女人数、平均BMI）"""
+    try:
+        total, female, male, avg_bmi = get_db().execute(STATS_SQL).fetchone()
+        return json_response({
             'success': True,
-            'count': len(records),
-            'records': records
+            'total': total,
+            'female': female,
+            'male': male,
+            'avg_bmi': None if avg_bmi is None else round(avg_bmi, 1)
         })
         
     except Exception as e:
-        print(f"❌ 获取记录错误: {e}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+        logger.error("❌ 获取统计错误: %s", e)
+        return json_response({'success': False, 'error': str(e)}), 500
+
+# 管理页面 - 静态HTML在导入时编码一次，并用ETag支持304协商缓存
+ADMIN_HTML = '''<!DOCTYPE html><html lang="zh-CN"><head><meta charset="UTF-8"><meta name="viewport" content="width=device-width,initial-scale=1"><title>数据管理</title><style>*{margin:0;padding:0;box-sizing:border-box}body{font-family:-apple-system,sans-serif;background:linear-gradient(135deg,#667eea 0%,#764ba2 100%);min-height:100vh;padding:40px 20px}.container{max-width:1200px;margin:0 auto}h1{text-align:center;color:#fff;margin-bottom:30px;font-size:2.5em}.stats{display:grid;grid-template-columns:repeat(auto-fit,minmax(200px,1fr));gap:20px;margin-bottom:30px}.stat-card{background:#fff;padding:20px;border-radius:12px;text-align:center;box-shadow:0 4px 15px rgba(0,0,0,.2)}.stat-label{color:#666;font-size:14px}.stat-value{color:#667eea;font-size:32px;font-weight:700}.btn{padding:12px 24px;background:#667eea;color:#fff;border:none;border-radius:8px;cursor:pointer;margin:20px auto;display:block}.table-container{background:#fff;border-radius:12px;padding:20px;box-shadow:0 4px 15px rgba(0,0,0,.2);overflow-x:auto}table{width:100%;border-collapse:collapse}th{background:#f8f9fa;padding:12px;font-size:14px;border-bottom:2px solid #e0e0e0}td{padding:10px;font-size:13px;border-bottom:1px solid #f0f0f0}tr:hover{background:#f8f9fa}.badge{padding:4px 12px;border-radius:12px;font-size:13px;font-weight:600}.badge-female{background:#ffe4e6;color:#e91e63}.badge-male{background:#e3f2fd;color:#2196f3}.size-badge{background:#667eea;color:#fff;padding:4px 10px;border-radius:6px}.loading{text-align:center;color:#fff;padding:40px}.spinner{border:4px solid rgba(255,255,255,.3);border-top:4px solid #fff;border-radius:50%;width:50px;height:50px;animation:spin 1s linear infinite;margin:20px auto}@keyframes spin{0%{transform:rotate(0deg)}100%{transform:rotate(360deg)}}</style></head><body><div class="container"><h1>📊 数据管理后台</h1><div class="stats"><div class="stat-card"><div class="stat-label">总记录</div><div class="stat-value" id="total">-</div></div><div class="stat-card"><div class="stat-label">女性</div><div class="stat-value" id="female">-</div></div><div class="stat-card"><div class="stat-label">男性</div><div class="stat-value" id="male">-</div></div><div class="stat-card"><div class="stat-label">平均BMI</div><div class="stat-value" id="bmi">-</div></div></div><button class="btn" onclick="load()">🔄 刷新</button><div id="loading" class="loading"><div class="spinner"></div><p>加载中...</p></div><div id="table" class="table-container" style="display:none"><table><thead><tr><th>ID</th><th>性别</th><th>身高</th><th>体重</th><th>胸围</th><th>腰围</th><th>臀围</th><th>上装</th><th>下装</th><th>BMI</th><th>时间</th></tr></thead><tbody id="tbody"></tbody></table></div></div><script>async function load(){document.getElementById("loading").style.display="block",document.getElementById("table").style.display="none";try{const[e,s]=await Promise.all([fetch("/api/records?limit=20"),fetch("/api/stats")]),t=await e.json(),r=await s.json();if(document.getElementById("loading").style.display="none",!t.success)throw new Error(t.error);if(!r.success)throw new Error(r.error);document.getElementById("total").textContent=r.total,document.getElementById("female").textContent=r.female,document.getElementById("male").textContent=r.male,document.getElementById("bmi").textContent=null===r.avg_bmi?"-":r.avg_bmi.toFixed(1);const a=t.records||[];if(0===a.length)return void alert("暂无数据");document.getElementById("table").style.display="block",document.getElementById("tbody").innerHTML=a.map(e=>{const t="female"===e.gender?"badge-female":"badge-male",a="female"===e.gender?"女":"男";return`<tr><td>${e.id}</td><td><span class="badge ${t}">${a}</span></td><td>${e.height}</td><td>${e.weight}</td><td>${e.bust}</td><td>${e.waist}</td><td>${e.hips}</td><td><span class="size-badge">${e.top_size}</span></td><td><span class="size-badge">${e.bottom_size}</span></td><td>${e.bmi}</td><td>${new Date(e.created_at).toLocaleString("zh-CN",{month:"2-digit",day:"2-digit",hour:"2-digit",minute:"2-digit"})}</td></tr>`}).join("")}catch(e){document.getElementById("loading").innerHTML="❌ "+e.message}}load(),setInterval(load,3e4)</script></body></html>'''.encode('utf-8')
+ADMIN_ETAG = hashlib.md5(ADMIN_HTML, usedforsecurity=False).hexdigest()
+ADMIN_HEADERS = {'Cache-Control': 'public, max-age=3600', 'ETag': f'"{ADMIN_ETAG}"'}
 
 @app.route('/admin')
 def admin_page():
     """管理页面 - 查看数据库记录"""
-    return '''<!DOCTYPE html><html lang="zh-CN"><head><meta charset="UTF-8"><meta name="viewport" content="width=device-width,initial-scale=1"><title>数据管理</title><style>*{margin:0;padding:0;box-sizing:border-box}body{font-family:-apple-system,sans-serif;background:linear-gradient(135deg,#667eea 0%,#764ba2 100%);min-height:100vh;padding:40px 20px}.container{max-width:1200px;margin:0 auto}h1{text-align:center;color:#fff;margin-bottom:30px;font-size:2.5em}.stats{display:grid;grid-template-columns:repeat(auto-fit,minmax(200px,1fr));gap:20px;margin-bottom:30px}.stat-card{background:#fff;padding:20px;border-radius:12px;text-align:center;box-shadow:0 4px 15px rgba(0,0,0,.2)}.stat-label{color:#666;font-size:14px}.stat-value{color:#667eea;font-size:32px;font-weight:700}.btn{padding:12px 24px;background:#667eea;color:#fff;border:none;border-radius:8px;cursor:pointer;margin:20px auto;display:block}.table-container{background:#fff;border-radius:12px;padding:20px;box-shadow:0 4px 15px rgba(0,0,0,.2);overflow-x:auto}table{width:100%;border-collapse:collapse}th{background:#f8f9fa;padding:12px;font-size:14px;border-bottom:2px solid #e0e0e0}td{padding:10px;font-size:13px;border-bottom:1px solid #f0f0f0}tr:hover{background:#f8f9fa}.badge{padding:4px 12px;border-radius:12px;font-size:13px;font-weight:600}.badge-female{background:#ffe4e6;color:#e91e63}.badge-male{background:#e3f2fd;color:#2196f3}.size-badge{background:#667eea;color:#fff;padding:4px 10px;border-radius:6px}.loading{text-align:center;color:#fff;padding:40px}.spinner{border:4px solid rgba(255,255,255,.3);border-top:4px solid #fff;border-radius:50%;width:50px;height:50px;animation:spin 1s linear infinite;margin:20px auto}@keyframes spin{0%{transform:rotate(0deg)}100%{transform:rotate(360deg)}}</style></head><body><div class="container"><h1>📊 数据管理后台</h1><div class="stats"><div class="stat-card"><div class="stat-label">总记录</div><div class="stat-value" id="total">-</div></div><div class="stat-card"><div class="stat-label">女性</div><div class="stat-value" id="female">-</div></div><div class="stat-card"><div class="stat-label">男性</div><div class="stat-value" id="male">-</div></div><div class="stat-card"><div class="stat-label">平均BMI</div><div class="stat-value" id="bmi">-</div></div></div><button class="btn" onclick="load()">🔄 刷新</button><div id="loading" class="loading"><div class="spinner"></div><p>加载中...</p></div><div id="table" class="table-container" style="display:none"><table><thead><tr><th>ID</th><th>性别</th><th>身高</th><th>体重</th><th>胸围</th><th>腰围</th><th>臀围</th><th>上装</th><th>下装</th><th>BMI</th><th>时间</th></tr></thead><tbody id="tbody"></tbody></table></div></div><script>async function load(){document.getElementById("loading").style.display="block",document.getElementById("table").style.display="none";try{const e=await fetch("/api/records"),t=await e.json();if(document.getElementById("loading").style.display="none",!t.success)throw new Error(t.error);const a=t.records||[];if(0===a.length)return void alert("暂无数据");document.getElementById("table").style.display="block";const n=a.length,d=a.filter(e=>"female"===e.gender).length,l=a.filter(e=>"male"===e.gender).length,o=n>0?(a.reduce((e,t)=>e+parseFloat(t.bmi),0)/n).toFixed(1):"-";document.getElementById("total").textContent=n,document.getElementById("female").textContent=d,document.getElementById("male").textContent=l,document.getElementById("bmi").textContent=o,document.getElementById("tbody").innerHTML=a.map(e=>{const t="female"===e.gender?"badge-female":"badge-male",a="female"===e.gender?"女":"男";return`<tr><td>${e.id}</td><td><span class="badge ${t}">${a}</span></td><td>${e.height}</td><td>${e.weight}</td><td>${e.bust}</td><td>${e.waist}</td><td>${e.hips}</td><td><span class="size-badge">${e.top_size}</span></td><td><span class="size-badge">${e.bottom_size}</span></td><td>${e.bmi}</td><td>${new Date(e.created_at).toLocaleString("zh-CN",{month:"2-digit",day:"2-digit",hour:"2-digit",minute:"2-digit"})}</td></tr>`}).join("")}catch(e){document.getElementById("loading").innerHTML="❌ "+e.message}}load(),setInterval(load,3e4)</script></body></html>'''
+    if request.if_none_match.contains_weak(ADMIN_ETAG):  # If-None-Match按RFC 9110使用弱比较
+        return Response(status=304, headers=ADMIN_HEADERS)
+    return Response(ADMIN_HTML, mimetype='text/html', headers=ADMIN_HEADERS)
 
 # 启动时初始化数据库
 init_database()
 
-# 启动服务器
+# 开发环境直接运行；生产环境使用gunicorn（见gunicorn.conf.py）
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    print(f"🚀 启动服务器在端口 {port}...")
-    print(f"📁 数据库位置: {DB_PATH}")
-    print(f"🔗 管理后台: /admin")
+    logger.info("🚀 启动服务器在端口 %d...", port)
+    logger.info("📁 数据库位置: %s", DB_PATH)
+    logger.info("🔗 管理后台: /admin")
     
     app.run(debug=False, host='0.0.0.0', port=port)